@@ -3,32 +3,157 @@ LLM Agent Configuration Module
 
 This module handles the initialization and configuration of the IBM Watson LLM
 used by the SQL Agent. It provides a clean interface for LLM setup.
+
+The IBM SDK and httpx are imported lazily, when a client is first built.
 """
 
+from __future__ import annotations
+
 import os
 import warnings
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from dotenv import load_dotenv
-from ibm_watsonx_ai.foundation_models import ModelInference
-from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
-from ibm_watson_machine_learning.foundation_models.extensions.langchain import WatsonxLLM
+
+if TYPE_CHECKING:
+    from ibm_watsonx_ai import APIClient
+    from langchain_ibm import WatsonxLLM
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 load_dotenv()
 
 
+@lru_cache(maxsize=1)
+def _env_snapshot() -> Dict[str, str]:
+    """Return the environment (including .env values), read once per process"""
+    return dict(os.environ)
+
+
+def env(key: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a configuration variable from the cached environment snapshot"""
+    return _env_snapshot().get(key, default)
+
+
+def refresh_env() -> None:
+    """Re-read the environment on the next configuration lookup"""
+    _env_snapshot.cache_clear()
+
+
+# Timeout (seconds) for HTTP calls to Watsonx
+HTTP_TIMEOUT = 120.0
+
+
 class LLMConfig:
     """Configuration class for LLM parameters"""
 
     def __init__(self):
-        self.model_id = os.getenv("MODEL_ID", "ibm/granite-3-2-8b-instruct")
-        self.max_tokens = int(os.getenv("MAX_TOKENS", "256"))
-        self.temperature = float(os.getenv("TEMPERATURE", "0.5"))
-        self.top_p = float(os.getenv("TOP_P", "0.95"))
-        self.repetition_penalty = float(os.getenv("REPETITION_PENALTY", "1.2"))
-        self.ibm_url = os.getenv("IBM_URL", "https://us-south.ml.cloud.ibm.com")
-        self.ibm_project_id = os.getenv("IBM_PROJECT_ID", "skills-network")
+        self.model_id = env("MODEL_ID", "ibm/granite-3-2-8b-instruct")
+        self.max_tokens = int(env("MAX_TOKENS", "256"))
+        self.temperature = float(env("TEMPERATURE", "0.5"))
+        self.top_p = float(env("TOP_P", "0.95"))
+        self.repetition_penalty = float(env("REPETITION_PENALTY", "1.2"))
+        self.ibm_url = env("IBM_URL", "https://us-south.ml.cloud.ibm.com")
+        self.ibm_project_id = env("IBM_PROJECT_ID", "skills-network")
+        self.ibm_api_key = env("IBM_API_KEY")
+        self.max_connections = int(env("LLM_MAX_CONN", "200"))
+        self.max_keepalive = int(env("LLM_MAX_KEEPALIVE", "100"))
+
+    @classmethod
+    def refresh(cls) -> None:
+        """Pick up environment changes made after the first config was built"""
+        refresh_env()
+
+
+# The client and LLM caches are unbounded: they hold one entry per distinct
+# parameter set, i.e. per endpoint (and token budget), so a fixed size would
+# evict entries as soon as more endpoints are configured (IBM_URLS).
+@lru_cache(maxsize=None)
+def get_api_client(
+    ibm_url: str,
+    ibm_project_id: str,
+    max_connections: int = 200,
+    max_keepalive: int = 100,
+    ibm_api_key: Optional[str] = None,
+) -> APIClient:
+    """
+    Return a shared Watsonx API client backed by a keep-alive connection pool
+
+    Every LLM step of an agent run reuses the pooled TLS connections instead
+    of opening a new connection per request. The pool limits apply to both
+    the sync and async clients, so concurrent callers are bounded by the
+    provider's rate limit rather than the local pool. (WatsonxLLM from
+    langchain-ibm 0.1.x has no native async generation: its ainvoke() runs
+    the sync client in a thread.) IBM Cloud endpoints
+    require ibm_api_key.
+    """
+    import httpx
+    from ibm_watsonx_ai import APIClient
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+    )
+
+    credentials = {"url": ibm_url}
+    if ibm_api_key:
+        credentials["api_key"] = ibm_api_key
+
+    return APIClient(
+        credentials=credentials,
+        project_id=ibm_project_id,
+        httpx_client=httpx.Client(limits=limits, timeout=HTTP_TIMEOUT),
+        async_httpx_client=httpx.AsyncClient(limits=limits, timeout=HTTP_TIMEOUT),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_llm(
+    model_id: str,
+    max_tokens: int,
+    temperature: float,
+    top_p: float,
+    repetition_penalty: float,
+    ibm_url: str,
+    ibm_project_id: str,
+    max_connections: int = 200,
+    max_keepalive: int = 100,
+    stop_sequences: Tuple[str, ...] = (),
+    ibm_api_key: Optional[str] = None,
+) -> WatsonxLLM:
+    """
+    Return a shared WatsonxLLM instance for the given parameters
+
+    Instances are cached per parameter set so repeated agent/LLM construction
+    reuses an already authenticated client instead of building a new one.
+    The model is bound to the pooled client from get_api_client().
+    Generation stops early at any of stop_sequences.
+    """
+    from ibm_watsonx_ai.foundation_models import ModelInference
+    from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
+    from langchain_ibm import WatsonxLLM
+
+    parameters = {
+        GenParams.MAX_NEW_TOKENS: max_tokens,
+        GenParams.MIN_NEW_TOKENS: 1,
+        GenParams.TEMPERATURE: temperature,
+        GenParams.TOP_P: top_p,
+        GenParams.REPETITION_PENALTY: repetition_penalty,
+    }
+    if stop_sequences:
+        parameters[GenParams.STOP_SEQUENCES] = list(stop_sequences)
+
+    model = ModelInference(
+        model_id=model_id,
+        params=parameters,
+        api_client=get_api_client(
+            ibm_url, ibm_project_id, max_connections, max_keepalive, ibm_api_key
+        ),
+        project_id=ibm_project_id,
+    )
+
+    return WatsonxLLM(watsonx_model=model)
 
 
 def create_llm(config: LLMConfig = None) -> WatsonxLLM:
@@ -44,24 +169,19 @@ def create_llm(config: LLMConfig = None) -> WatsonxLLM:
     if config is None:
         config = LLMConfig()
 
-    parameters = {
-        GenParams.MAX_NEW_TOKENS: config.max_tokens,
-        GenParams.TEMPERATURE: config.temperature,
-        GenParams.TOP_P: config.top_p,
-        GenParams.REPETITION_PENALTY: config.repetition_penalty,
-    }
-
-    credentials = {"url": config.ibm_url}
-
-    model = ModelInference(
-        model_id=config.model_id,
-        params=parameters,
-        credentials=credentials,
-        project_id=config.ibm_project_id,
+    return get_llm(
+        config.model_id,
+        config.max_tokens,
+        config.temperature,
+        config.top_p,
+        config.repetition_penalty,
+        config.ibm_url,
+        config.ibm_project_id,
+        config.max_connections,
+        config.max_keepalive,
+        ibm_api_key=config.ibm_api_key,
     )
 
-    return WatsonxLLM(model=model)
-
 
 def test_llm():
     """Test the LLM with a simple query"""
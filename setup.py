@@ -34,12 +34,12 @@ setup(
         "langchain-ibm==0.1.7",
         "langchain-community==0.0.59",
         "langchain-experimental==0.0.59",
-        "ibm-watsonx-ai==1.0.4",
-        "ibm-watson-machine-learning==1.0.357",
+        "ibm-watsonx-ai>=1.3.1",
         "mysql-connector-python==8.4.0",
         "sqlalchemy>=2.0.0",
         "python-dotenv>=1.0.0",
         "requests>=2.31.0",
+        "httpx>=0.27.0",
     ],
     extras_require={
         "dev": [
@@ -48,6 +48,15 @@ setup(
             "black>=23.0.0",
             "flake8>=6.0.0",
         ],
+        "cache": [
+            "gptcache>=0.1.43",
+        ],
+        "compress": [
+            "llmlingua>=0.2.0",
+        ],
+        "mem0": [
+            "mem0ai>=0.1.0",
+        ],
     },
     entry_points={
         "console_scripts": [
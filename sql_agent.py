@@ -12,57 +12,306 @@ Key LCEL Features Used:
 - RunnableLambda: Create custom runnable functions
 - Tool: Define callable tools for the agent
 - AgentExecutor: Execute agent with tools
+
+LangChain and IBM SDK imports are deferred to the methods that need them, so
+importing this module (e.g. for SQLAgentConfig) stays cheap.
 """
 
-import os
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import sys
+import threading
+import time
 import warnings
-from typing import Any, Dict, List, Optional
-
-from dotenv import load_dotenv
-from ibm_watsonx_ai.foundation_models import ModelInference
-from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
-from ibm_watson_machine_learning.foundation_models.extensions.langchain import WatsonxLLM
-from langchain.agents import AgentType, create_react_agent, AgentExecutor
-from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_community.tools.sql_database.tool import (
-    QuerySQLDatabaseTool,
-    InfoSQLDatabaseTool,
-    ListSQLDatabaseTool,
-)
-from langchain_core.runnables import (
-    Runnable,
-    RunnablePassthrough,
-    RunnableLambda,
-    RunnableParallel,
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
 )
-from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.tools import Tool
 
-# Suppress warnings
+from llm_agent import env, get_llm, refresh_env
+
+if TYPE_CHECKING:
+    from langchain_ibm import WatsonxLLM
+    from langchain.agents import AgentExecutor
+    from langchain.memory import ConversationBufferWindowMemory
+    from langchain_community.utilities.sql_database import SQLDatabase
+    from langchain_core.runnables import Runnable
+    from langchain_core.tools import Tool
+
+# Suppress warnings (.env is loaded once by llm_agent)
 warnings.filterwarnings("ignore")
-load_dotenv()
 
 
 class SQLAgentConfig:
     """Configuration for the SQL Agent"""
 
     def __init__(self):
-        self.model_id = os.getenv("MODEL_ID", "ibm/granite-3-2-8b-instruct")
-        self.max_tokens = int(os.getenv("MAX_TOKENS", "1024"))
-        self.temperature = float(os.getenv("TEMPERATURE", "0.2"))
-        self.top_p = float(os.getenv("TOP_P", "0.95"))
-        self.repetition_penalty = float(os.getenv("REPETITION_PENALTY", "1.2"))
+        self.model_id = env("MODEL_ID", "ibm/granite-3-2-8b-instruct")
+        # Token budget for answers written from query results
+        self.max_tokens = int(env("MAX_TOKENS", "1024"))
+        # Token budget for each ReAct routing step (Thought/Action/Action Input
+        # or the Final Answer); a step carries a full SQL query, so 128 tokens
+        # would truncate joins
+        self.agent_max_tokens = int(env("AGENT_MAX_TOKENS", "256"))
+        # Token budget for short SQL generation / verification calls
+        self.sql_max_tokens = int(env("SQL_MAX_TOKENS", "128"))
+        self.temperature = float(env("TEMPERATURE", "0.2"))
+        self.top_p = float(env("TOP_P", "0.95"))
+        self.repetition_penalty = float(env("REPETITION_PENALTY", "1.2"))
+
+        self.ibm_api_key = env("IBM_API_KEY")
+        self.ibm_project_id = env("IBM_PROJECT_ID", "skills-network")
+        self.ibm_url = env("IBM_URL", "https://us-south.ml.cloud.ibm.com")
+        # Optional comma-separated endpoints/projects to spread LLM calls over
+        self.ibm_urls = _split_list(env("IBM_URLS", self.ibm_url))
+        self.ibm_project_ids = _split_list(
+            env("IBM_PROJECT_IDS", self.ibm_project_id)
+        )
+        self.max_connections = int(env("LLM_MAX_CONN", "200"))
+        self.max_keepalive = int(env("LLM_MAX_KEEPALIVE", "100"))
+
+        self.mysql_user = env("MYSQL_USER", "root")
+        self.mysql_password = env("MYSQL_PASSWORD")
+        self.mysql_host = env("MYSQL_HOST", "localhost")
+        self.mysql_port = env("MYSQL_PORT", "3306")
+        self.mysql_database = env("MYSQL_DATABASE", "chinook")
+        self.db_pool_size = int(env("DB_POOL_SIZE", "10"))
+        self.db_max_overflow = int(env("DB_MAX_OVERFLOW", "20"))
+        self.schema_ttl_s = int(env("SCHEMA_TTL_S", "300"))
+
+        self.compress_prompt = env("COMPRESS_PROMPT", "0") == "1"
+
+        # Opt-in: cached completions never expire (see _initialize_llm_cache)
+        self.llm_cache = env("LLM_CACHE", "0") == "1"
+        self.llm_cache_path = env("LLM_CACHE_PATH", ".llm_cache.db")
+        self.semantic_cache_dir = env("SEMANTIC_CACHE_DIR", "gptcache_data")
+
+        self.prewarm = env("PREWARM", "1") == "1"
+        self.verbose = env("VERBOSE", "False").lower() == "true"
+
+        self.memory_k = int(env("MEMORY_K", "5"))
+        self.use_mem0 = env("USE_MEM0", "0") == "1"
+        self.mem0_user_id = env("MEM0_USER_ID", "sql-agent")
+
+    @classmethod
+    def refresh(cls) -> None:
+        """Pick up environment changes made after the first config was built"""
+        refresh_env()
+
+
+def _split_list(value: str) -> List[str]:
+    """Split a comma-separated configuration value"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _normalize_question(question: str) -> str:
+    """Normalize a question for cache lookups (case and whitespace)"""
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+DANGEROUS_KEYWORDS = frozenset({"DROP", "DELETE", "TRUNCATE", "ALTER"})
+
+# Recovery suggestions, keyed by a lowercase fragment of the error message
+ERROR_SUGGESTIONS = {
+    "syntax error": "Check SQL syntax - ensure proper spacing and quotes",
+    "table not found": "Verify table name exists in database",
+    "column not found": "Check column name spelling and table reference",
+    "access denied": "Verify database credentials and permissions",
+}
+
+_LITERAL_RE = re.compile(r"'([^']*)'|\"([^\"]*)\"|(\d+)")
+
+
+# A fenced ```sql block, preferred when the model wraps its answer in one
+_SQL_FENCE_RE = re.compile(r"```(?:sql)?[ \t]*\n(.*?)```", re.IGNORECASE | re.DOTALL)
+
+# A statement at the start of a line: upper-case keywords, or any case as long
+# as a FROM follows, so prose such as "query with MySQL syntax" is not matched
+_SQL_RE = re.compile(
+    r"^[ \t]*((?:SELECT|WITH)\b.*?)(?=;|```|\Z)"
+    r"|^[ \t]*((?i:select|with)\b[^;]*?(?i:\bfrom\b).*?)(?=;|```|\Z)",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def _extract_sql(text: str) -> str:
+    """
+    Extract the first SELECT (or WITH) statement from LLM output
+
+    Raises:
+        ValueError: If the output contains no query
+    """
+    fence = _SQL_FENCE_RE.search(text)
+    match = _SQL_RE.search(fence.group(1)) if fence else None
+    if match is None:
+        match = _SQL_RE.search(text)
+    if match is None:
+        raise ValueError(f"No SQL query found in: {text!r}")
+    return (match.group(1) or match.group(2)).strip()
+
+
+_FROM_RE = re.compile(r"\bFROM\s+`?(\w+)`?", re.IGNORECASE)
+
+_WHERE_RE = re.compile(
+    r"\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+_FILTER_RE = re.compile(r"`?(\w+)`?\s*=\s*('[^']*'|\d+(?:\.\d+)?)")
+
+
+def _parse_slots(sql: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """Return the first FROM table and the equality filters of a query"""
+    table = _FROM_RE.search(sql)
+    where = _WHERE_RE.search(sql)
+    filters = dict(_FILTER_RE.findall(where.group(1))) if where else {}
+    return (table.group(1) if table else None), filters
+
+
+# Maximum characters of each remembered message included in the prompt
+MEMORY_MESSAGE_CHARS = 500
+
+# Pronouns and ellipsis that make a question refer back to the conversation
+# ("their albums", "what about Brazil?", "and the year before?")
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|they|them|their|those|these|this|he|she|him|his|her"
+    r"|same|also|too|again|instead|previous|above|what about|how about)\b"
+    r"|^\s*(?:and|or|but|only|just)\b",
+    re.IGNORECASE,
+)
+
+# Questions this short ("Brazil?", "In 2019?") lean on the previous turn
+FOLLOW_UP_MAX_WORDS = 2
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1)
+def _prompt_compressor() -> Any:
+    """Load the LLMLingua prompt compressor once per process (optional)"""
+    from llmlingua import PromptCompressor
+
+    return PromptCompressor()
+
+
+def _format_agent_input(prefetched: Dict[str, str], question: str) -> str:
+    """Prefix the agent input with the prefetched table list and schema"""
+    schema = f"Schema:\n{prefetched['schema']}\n" if prefetched["schema"] else ""
+    return f"Tables: {prefetched['tables']}\n{schema}\n{question}"
+
+
+def _is_follow_up(question: str) -> bool:
+    """Return True if a question depends on the conversation context"""
+    return (
+        _FOLLOW_UP_RE.search(question) is not None
+        or len(_WORD_RE.findall(question)) <= FOLLOW_UP_MAX_WORDS
+    )
+
+
+def _is_error(observation: Any) -> bool:
+    """Return True if a query tool result is an error or a validation warning"""
+    return str(observation).startswith(("Error", "⚠️"))
+
+
+def _question_template(question: str) -> Tuple[str, List[str]]:
+    """
+    Split a question into a literal-free template and its literals
+
+    Numbers become <N> and quoted strings become <S>, so "top 5 artists" and
+    "top 10 artists" share a template with literals ["5"] and ["10"].
+    """
+    literals = []
+
+    def _placeholder(match: re.Match) -> str:
+        if match.group(3) is not None:
+            literals.append(match.group(3))
+            return "<N>"
+        string = match.group(1) if match.group(1) is not None else match.group(2)
+        literals.append(string)
+        return "<S>"
+
+    template = _LITERAL_RE.sub(_placeholder, question.strip())
+    return _normalize_question(template), literals
+
+
+def _substitute_literals(
+    sql: str, old_literals: List[str], new_literals: List[str]
+) -> Optional[str]:
+    """
+    Replace the literals of a cached question's SQL with a new question's
+
+    Returns None when a changed literal cannot be located in the SQL, since
+    the cached plan then cannot be safely adapted.
+    """
+    mapping = {
+        old: new.replace("'", "''")
+        for old, new in zip(old_literals, new_literals)
+        if old != new
+    }
+    if not mapping:
+        return sql
+
+    # Literals are not matched inside identifiers or decimals ("0.5")
+    pattern = re.compile(
+        r"(?<![\w.])("
+        + "|".join(re.escape(old) for old in sorted(mapping, key=len, reverse=True))
+        + r")(?![\w.])"
+    )
+    if set(pattern.findall(sql)) != set(mapping):
+        return None
+    return pattern.sub(lambda match: mapping[match.group(1)], sql)
+
+
+SYSTEM_PROMPT_RULES = """You are a SQL assistant. Use the tables and schema \
+given with the question (list tables or read schemas only if something is \
+missing), run one SELECT query, and briefly explain the result."""
+
+SYSTEM_PROMPT_FORMAT = """Tools:
+{tools}
+
+Use this format:
+Thought: your reasoning
+Action: one of [{tool_names}]
+Action Input: the tool input
+Observation: the tool result
+... (repeat Thought/Action/Action Input/Observation as needed)
+Final Answer: the answer to the question"""
 
-        self.ibm_api_key = os.getenv("IBM_API_KEY")
-        self.ibm_project_id = os.getenv("IBM_PROJECT_ID", "skills-network")
-        self.ibm_url = os.getenv("IBM_URL", "https://us-south.ml.cloud.ibm.com")
+# SQL generation stops at the statement terminator instead of running on
+SQL_STOP_SEQUENCES = (";",)
 
-        self.mysql_user = os.getenv("MYSQL_USER", "root")
-        self.mysql_password = os.getenv("MYSQL_PASSWORD")
-        self.mysql_host = os.getenv("MYSQL_HOST", "localhost")
-        self.mysql_port = os.getenv("MYSQL_PORT", "3306")
-        self.mysql_database = os.getenv("MYSQL_DATABASE", "chinook")
+SQL_PROMPT = """MySQL schema:
+{schema}
+
+Write one MySQL SELECT query that answers the question. Reply with SQL only.
+Question: {question}
+SQL:"""
+
+ANSWER_PROMPT = """Question: {question}
+SQL: {sql}
+Result: {rows}
+
+Answer the question briefly using the result.
+Answer:"""
+
+VERIFY_PROMPT = """Question: {question}
+SQL: {sql}
+Does this SQL query correctly answer the question? Answer YES or NO."""
 
 
 class SQLAgent:
@@ -79,42 +328,198 @@ class SQLAgent:
     Input → Validation → LLM with Tools → Agent Executor → Output Formatting
     """
 
+    # Maximum number of question templates kept in the plan cache
+    PLAN_CACHE_SIZE = 256
+
+    _DANGER_RE = re.compile(
+        r"\b(" + "|".join(sorted(DANGEROUS_KEYWORDS)) + r")\b", re.IGNORECASE
+    )
+    _ERR_RE = re.compile(
+        "(" + "|".join(map(re.escape, ERROR_SUGGESTIONS)) + ")", re.IGNORECASE
+    )
+
     def __init__(self, config: SQLAgentConfig = None):
         """Initialize the SQL Agent with configuration"""
         self.config = config or SQLAgentConfig()
-        self.llm = self._initialize_llm()
+        self._initialize_llm_cache()
+        self._sem_cache = self._initialize_semantic_cache()
+        self._plan_cache: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+        self.memory = self._initialize_memory()
+        self.slots: Dict[str, Any] = {"active_table": None, "active_filters": {}}
+        self._mem0 = self._initialize_mem0()
+        self.llms = self._initialize_llms()
+        self._rr = itertools.cycle(self.llms)
+        self.step_llms = self._initialize_llms(self.config.agent_max_tokens)
+        self._step_rr = itertools.cycle(self.step_llms)
+        self.sql_llms = self._initialize_llms(
+            self.config.sql_max_tokens, SQL_STOP_SEQUENCES
+        )
+        self._sql_rr = itertools.cycle(self.sql_llms)
         self.db = self._initialize_database()
         self.tools = self._create_tools()
         self.agent_executor = self._create_agent_executor()
+        self.fast_chain = self._create_fast_chain()
+        self.schema_prefetch = self._create_schema_prefetch()
 
-    def _initialize_llm(self) -> WatsonxLLM:
-        """Initialize the LLM using IBM Watson"""
-        parameters = {
-            GenParams.MAX_NEW_TOKENS: self.config.max_tokens,
-            GenParams.TEMPERATURE: self.config.temperature,
-            GenParams.TOP_P: self.config.top_p,
-            GenParams.REPETITION_PENALTY: self.config.repetition_penalty,
-        }
+        if self.config.prewarm:
+            threading.Thread(target=self._prewarm, daemon=True).start()
+
+    def _initialize_llm_cache(self) -> None:
+        """
+        Cache token-identical LLM prompts in a local SQLite database (LLM_CACHE=1)
+
+        The cache is process-wide (it applies to every LangChain LLM) and has
+        no TTL: an identical prompt returns the stored completion even after
+        the data has changed, so only enable it for static databases.
+        """
+        if not self.config.llm_cache:
+            return
+
+        from langchain.globals import set_llm_cache
+        from langchain_community.cache import SQLiteCache
+
+        set_llm_cache(SQLiteCache(database_path=self.config.llm_cache_path))
+
+    def _initialize_llms(
+        self, max_tokens: Optional[int] = None, stop_sequences: Tuple[str, ...] = ()
+    ) -> List[WatsonxLLM]:
+        """
+        Initialize one LLM per configured Watsonx endpoint
+
+        A single project ID is shared by all endpoints; otherwise there must
+        be one project ID per endpoint. max_tokens defaults to
+        config.max_tokens.
+        """
+        urls = self.config.ibm_urls
+        project_ids = self.config.ibm_project_ids
+        if len(project_ids) == 1:
+            project_ids = project_ids * len(urls)
+        if len(project_ids) != len(urls):
+            raise ValueError(
+                "IBM_PROJECT_IDS must contain one project ID "
+                "or one per IBM_URLS endpoint"
+            )
+
+        return [
+            self._initialize_llm(
+                url,
+                project_id,
+                max_tokens or self.config.max_tokens,
+                stop_sequences,
+            )
+            for url, project_id in zip(urls, project_ids)
+        ]
+
+    def _initialize_llm(
+        self,
+        ibm_url: str,
+        ibm_project_id: str,
+        max_tokens: int,
+        stop_sequences: Tuple[str, ...] = (),
+    ) -> WatsonxLLM:
+        """Initialize the LLM using IBM Watson (shared with llm_agent)"""
+        return get_llm(
+            self.config.model_id,
+            max_tokens,
+            self.config.temperature,
+            self.config.top_p,
+            self.config.repetition_penalty,
+            ibm_url,
+            ibm_project_id,
+            self.config.max_connections,
+            self.config.max_keepalive,
+            stop_sequences,
+            ibm_api_key=self.config.ibm_api_key,
+        )
+
+    def _route_llm(self, prompt: Any) -> str:
+        """Send an agent step to the next LLM endpoint (round-robin)"""
+        return next(self._step_rr).invoke(prompt, stop=["\nObservation"])
+
+    async def _aroute_llm(self, prompt: Any) -> str:
+        """Asynchronous version of _route_llm()"""
+        return await next(self._step_rr).ainvoke(prompt, stop=["\nObservation"])
+
+    def _prewarm(self) -> None:
+        """
+        Open the LLM and database connections ahead of the first question
+
+        Calls the model directly (bypassing the LLM cache) with a one-token
+        generation and runs a trivial query, so the connection pools are hot.
+        Failures are ignored; the first real question will surface them.
+        """
+        from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
+
+        for llm in self.llms:
+            try:
+                llm.watsonx_model.generate_text(
+                    prompt="ping", params={GenParams.MAX_NEW_TOKENS: 1}
+                )
+            except Exception:
+                pass
+
+        try:
+            self.db.run("SELECT 1")
+        except Exception:
+            pass
+
+    def _initialize_semantic_cache(self) -> Optional[Any]:
+        """
+        Initialize the question-level semantic cache
+
+        GPTCache is optional: when it is not installed or cannot be set up
+        (e.g. its embedding model fails to load) answers are not cached and
+        every question runs the full pipeline.
+        """
+        try:
+            from gptcache.adapter import api as gptcache_api
+
+            gptcache_api.init_similar_cache(data_dir=self.config.semantic_cache_dir)
+        except Exception:
+            return None
+        return gptcache_api
 
-        credentials = {"url": self.config.ibm_url}
+    def _initialize_memory(self) -> ConversationBufferWindowMemory:
+        """Keep the last config.memory_k question/answer turns"""
+        from langchain.memory import ConversationBufferWindowMemory
 
-        model = ModelInference(
-            model_id=self.config.model_id,
-            params=parameters,
-            credentials=credentials,
-            project_id=self.config.ibm_project_id,
+        return ConversationBufferWindowMemory(
+            k=self.config.memory_k, return_messages=True
         )
 
-        return WatsonxLLM(model=model)
+    def _initialize_mem0(self) -> Optional[Any]:
+        """Initialize the optional Mem0 long-term memory (USE_MEM0=1)"""
+        if not self.config.use_mem0:
+            return None
+
+        from mem0 import MemoryClient
+
+        return MemoryClient()
 
     def _initialize_database(self) -> SQLDatabase:
-        """Initialize the database connection"""
+        """
+        Initialize the database connection
+
+        Connections are pooled and health-checked so the several tool calls of
+        an agent run do not each pay the MySQL connect/auth handshake.
+        """
+        from langchain_community.utilities.sql_database import SQLDatabase
+
         mysql_uri = (
             f"mysql+mysqlconnector://{self.config.mysql_user}:"
             f"{self.config.mysql_password}@{self.config.mysql_host}:"
             f"{self.config.mysql_port}/{self.config.mysql_database}"
         )
-        return SQLDatabase.from_uri(mysql_uri)
+        return SQLDatabase.from_uri(
+            mysql_uri,
+            engine_args={
+                "pool_size": self.config.db_pool_size,
+                "max_overflow": self.config.db_max_overflow,
+                "pool_pre_ping": True,
+                "pool_recycle": 1800,
+                "pool_timeout": 30,
+            },
+        )
 
     def _create_tools(self) -> List[Tool]:
         """
@@ -124,51 +529,88 @@ class SQLAgent:
         - QuerySQLDatabaseTool: Execute SQL queries
         - InfoSQLDatabaseTool: Get table schema information
         - ListSQLDatabaseTool: List all tables
+
+        Validation and error recovery run inside the query tool rather than
+        as separate tools, which saves the LLM a reasoning turn per question.
+
+        The list and info tools are memoized for config.schema_ttl_s seconds,
+        since the schema rarely changes between questions.
         """
+        from langchain_community.tools.sql_database.tool import (
+            InfoSQLDatabaseTool,
+            ListSQLDatabaseTool,
+        )
+        from langchain_core.tools import Tool
+
+        from sql_tools import SafeQuerySQLDatabaseTool
+
         # Built-in SQL tools from LangChain community
-        query_tool = QuerySQLDatabaseTool(db=self.db)
+        query_tool = SafeQuerySQLDatabaseTool(
+            db=self.db,
+            validate_query=self._validate_sql_query,
+            recover_from_error=self._recover_from_error,
+        )
+        self._query_tool = query_tool
         info_tool = InfoSQLDatabaseTool(db=self.db)
         list_tool = ListSQLDatabaseTool(db=self.db)
 
-        # Custom validation tool
-        validate_tool = Tool(
-            name="validate_sql_query",
-            func=self._validate_sql_query,
-            description="Validate if a SQL query is safe and well-formed",
-        )
+        def _list_tables(_bucket: float) -> str:
+            return list_tool.run("")
+
+        def _table_info(table_names: str, _bucket: float) -> str:
+            return info_tool.run(table_names)
+
+        self._list_tables = lru_cache(maxsize=1)(_list_tables)
+        self._table_info = lru_cache(maxsize=64)(_table_info)
 
-        # Custom error recovery tool
-        error_recovery_tool = Tool(
-            name="recover_from_error",
-            func=self._recover_from_error,
-            description="Recover from SQL execution errors and suggest fixes",
+        cached_list_tool = Tool(
+            name=list_tool.name,
+            func=self._cached_table_names,
+            description=list_tool.description,
+        )
+        cached_info_tool = Tool(
+            name=info_tool.name,
+            func=self._cached_table_info,
+            description=info_tool.description,
         )
 
-        return [query_tool, info_tool, list_tool, validate_tool, error_recovery_tool]
+        return [query_tool, cached_info_tool, cached_list_tool]
 
-    def _validate_sql_query(self, query: str) -> str:
-        """Validate SQL query safety"""
-        dangerous_keywords = ["DROP", "DELETE", "TRUNCATE", "ALTER"]
-        query_upper = query.upper()
+    def _schema_bucket(self) -> float:
+        """Return the current schema cache time bucket"""
+        if self.config.schema_ttl_s <= 0:
+            return time.monotonic()
+        return time.monotonic() // self.config.schema_ttl_s
 
-        for keyword in dangerous_keywords:
-            if keyword in query_upper:
-                return f"⚠️ Query contains dangerous keyword: {keyword}"
+    def _cached_table_names(self, _tool_input: str = "") -> str:
+        """List the database tables, memoized for the schema TTL"""
+        return self._list_tables(self._schema_bucket())
 
-        return "✅ Query appears safe"
+    def _cached_table_info(self, table_names: str) -> str:
+        """Describe the given tables, memoized for the schema TTL"""
+        tables = ", ".join(
+            sorted(name.strip() for name in table_names.split(",") if name.strip())
+        )
+        return self._table_info(tables, self._schema_bucket())
+
+    def _validate_sql_query(self, query: str) -> None:
+        """
+        Validate SQL query safety
+
+        Raises:
+            ValueError: If the query contains a dangerous keyword
+        """
+        match = self._DANGER_RE.search(query)
+        if match is not None:
+            raise ValueError(
+                f"Query contains dangerous keyword: {match.group(1).upper()}"
+            )
 
     def _recover_from_error(self, error_message: str) -> str:
         """Provide recovery suggestions for SQL errors"""
-        suggestions = {
-            "syntax error": "Check SQL syntax - ensure proper spacing and quotes",
-            "table not found": "Verify table name exists in database",
-            "column not found": "Check column name spelling and table reference",
-            "access denied": "Verify database credentials and permissions",
-        }
-
-        for error_key, suggestion in suggestions.items():
-            if error_key.lower() in error_message.lower():
-                return f"💡 Suggestion: {suggestion}"
+        match = self._ERR_RE.search(error_message)
+        if match is not None:
+            return f"💡 Suggestion: {ERROR_SUGGESTIONS[match.group(1).lower()]}"
 
         return "❓ Unknown error - check database connection"
 
@@ -178,24 +620,11 @@ class SQLAgent:
 
         Uses create_react_agent for REACT (Reasoning + Acting) pattern
         """
-        # Create system prompt for the agent
-        system_prompt = """You are an expert SQL database assistant. Your job is to help users query databases using natural language.
-
-You have access to the following tools:
-1. query_sql_database: Execute SQL queries
-2. info_sql_database: Get table schema information
-3. list_sql_database: List all available tables
-4. validate_sql_query: Validate SQL queries
-5. recover_from_error: Get help with SQL errors
+        from langchain.agents import AgentExecutor, create_react_agent
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.runnables import RunnableLambda
 
-When a user asks a question:
-1. First, list available tables using list_sql_database
-2. Get schema info for relevant tables using info_sql_database
-3. Construct and validate the SQL query
-4. Execute the query using query_sql_database
-5. Format and explain the results
-
-Always be helpful and explain what you're doing."""
+        system_prompt = self._build_system_prompt()
 
         prompt = ChatPromptTemplate.from_messages(
             [
@@ -206,20 +635,167 @@ Always be helpful and explain what you're doing."""
         )
 
         # Create REACT agent using LCEL
-        agent = create_react_agent(self.llm, self.tools, prompt)
+        # Agent steps are spread over all configured endpoints; the ReAct stop
+        # sequence is applied by _route_llm instead of create_react_agent
+        llm = RunnableLambda(self._route_llm, afunc=self._aroute_llm)
+        agent = create_react_agent(llm, self.tools, prompt, stop_sequence=False)
 
         # Create agent executor
         agent_executor = AgentExecutor(
             agent=agent,
             tools=self.tools,
-            verbose=True,
+            verbose=self.config.verbose,
             handle_parsing_errors=True,
             max_iterations=10,
+            return_intermediate_steps=True,
         )
 
         return agent_executor
 
-    def query(self, question: str) -> Dict[str, Any]:
+    def _create_fast_chain(self) -> Runnable:
+        """
+        Create the single-shot LCEL chain for simple questions
+
+        schema → SQL prompt → LLM → SQL extraction → verified query → answer
+        prompt → LLM, with no ReAct reasoning turns. Only the schema of the
+        tables named in the question is sent (see _prefetch_schema). The
+        query is checked with VERIFY_PROMPT while it runs (see _run_plan).
+        The chain raises ValueError when the question names no table (before
+        any LLM call), no SQL can be extracted, or the query fails or is
+        rejected by the check, so the caller can fall back to the agent. The
+        answer is generated as a stream, so chain.stream() yields it token
+        by token.
+
+        Input: {"question": str}
+        Output: the input plus "schema", "sql", "rows" and "answer"
+        """
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.runnables import (
+            RunnableGenerator,
+            RunnableLambda,
+            RunnablePassthrough,
+        )
+
+        sql_llm = RunnableLambda(lambda prompt: next(self._sql_rr).invoke(prompt))
+        answer_llm = RunnableGenerator(self._stream_llm, self._astream_llm)
+
+        generate_sql = (
+            PromptTemplate.from_template(SQL_PROMPT)
+            | sql_llm
+            | StrOutputParser()
+            | RunnableLambda(_extract_sql)
+        )
+        format_answer = (
+            PromptTemplate.from_template(ANSWER_PROMPT)
+            | answer_llm
+            | StrOutputParser()
+        )
+
+        def _schema(inputs: Dict[str, Any]) -> str:
+            schema = self._prefetch_schema(inputs["question"])
+            if not schema:
+                raise ValueError("The question names no table")
+            return schema
+
+        def _checked(rows: Optional[str]) -> str:
+            if rows is None:
+                raise ValueError("The query failed or does not fit the question")
+            return rows
+
+        def _rows(inputs: Dict[str, Any]) -> str:
+            return _checked(self._run_plan(inputs["question"], inputs["sql"]))
+
+        async def _arows(inputs: Dict[str, Any]) -> str:
+            return _checked(await self._arun_plan(inputs["question"], inputs["sql"]))
+
+        return (
+            RunnablePassthrough.assign(schema=_schema)
+            | RunnablePassthrough.assign(sql=generate_sql)
+            | RunnablePassthrough.assign(rows=RunnableLambda(_rows, afunc=_arows))
+            | RunnablePassthrough.assign(answer=format_answer)
+        )
+
+    def _create_schema_prefetch(self) -> Runnable:
+        """
+        Create the parallel schema lookup run before the agent
+
+        Fetches the table list and the schema of the tables relevant to the
+        question concurrently, so the agent can skip its list/info tool turns.
+        The schema is empty when the question names no table; the agent then
+        reads only the schemas it needs with info_sql_database.
+
+        Input: question (str)
+        Output: {"tables": str, "schema": str}
+        """
+        from langchain_core.runnables import RunnableLambda, RunnableParallel
+
+        return RunnableParallel(
+            tables=RunnableLambda(lambda _: self._cached_table_names()),
+            schema=RunnableLambda(self._prefetch_schema),
+        )
+
+    def _prefetch_schema(self, question: str) -> str:
+        """Describe the tables mentioned in a question ("" if there are none)"""
+        tables = self._top_tables(question)
+        return self._cached_table_info(tables) if tables else ""
+
+    def _top_tables(self, question: str) -> str:
+        """
+        Return the tables mentioned in a question, comma-separated
+
+        A table matches if its name, or its name without a trailing "s", is
+        one of the question's words (e.g. "albums" matches Album). Returns
+        an empty string when none match.
+        """
+        words = {word.rstrip("s") for word in _WORD_RE.findall(question.lower())}
+        tables = _split_list(self._cached_table_names())
+        mentioned = [table for table in tables if table.lower().rstrip("s") in words]
+        return ", ".join(mentioned)
+
+    def _agent_input(self, turn: Dict[str, Any]) -> str:
+        """Build the agent input: prefetched schema plus the question in context"""
+        prefetched = self.schema_prefetch.invoke(turn["question"])
+        return _format_agent_input(prefetched, turn["input"])
+
+    async def _aagent_input(self, turn: Dict[str, Any]) -> str:
+        """Asynchronous version of _agent_input()"""
+        prefetched = await self.schema_prefetch.ainvoke(turn["question"])
+        return _format_agent_input(prefetched, turn["input"])
+
+    def _run_sql(self, sql: str) -> str:
+        """
+        Run a query through the validated query tool
+
+        Raises:
+            ValueError: If the query is rejected or fails
+        """
+        rows = str(self._query_tool.run(sql))
+        if _is_error(rows):
+            raise ValueError(rows)
+        return rows
+
+    def _build_system_prompt(self) -> str:
+        """
+        Build the agent system prompt
+
+        With config.compress_prompt the rules are additionally compressed with
+        LLMLingua (optional dependency); the tool list and ReAct format are
+        never compressed since the agent output parser depends on them.
+        """
+        rules = SYSTEM_PROMPT_RULES
+        if self.config.compress_prompt:
+            try:
+                compressor = _prompt_compressor()
+            except ImportError:
+                pass
+            else:
+                compressed = compressor.compress_prompt(rules, rate=0.5)
+                rules = compressed["compressed_prompt"]
+
+        return f"{rules}\n\n{SYSTEM_PROMPT_FORMAT}"
+
+    def query(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
         """
         Execute a natural language query using LCEL agent
 
@@ -227,12 +803,29 @@ Always be helpful and explain what you're doing."""
         1. Understand the database schema
         2. Generate appropriate SQL
         3. Execute and return results
+
+        With use_memory=False the question is answered without the
+        conversation context and the turn is not remembered.
         """
         try:
-            result = self.agent_executor.invoke({"input": question})
             return {
                 "question": question,
-                "answer": result.get("output", "No result"),
+                "answer": self._answer(question, use_memory),
+                "status": "success",
+            }
+        except Exception as e:
+            return {
+                "question": question,
+                "answer": f"Error: {str(e)}",
+                "status": "error",
+            }
+
+    async def aquery(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
+        """Asynchronous version of query()"""
+        try:
+            return {
+                "question": question,
+                "answer": await self._aanswer(question, use_memory),
                 "status": "success",
             }
         except Exception as e:
@@ -242,6 +835,493 @@ Always be helpful and explain what you're doing."""
                 "status": "error",
             }
 
+    async def abatch(
+        self,
+        questions: List[str],
+        max_concurrency: int = 10,
+        rate_limit: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer several questions concurrently
+
+        The questions are independent: they are answered without the
+        conversation memory, so concurrent turns cannot leak into each
+        other's context. WatsonxLLM has no native async generation, so its
+        calls run on the event loop's default thread pool, which also caps
+        the effective concurrency.
+
+        Args:
+            questions: Natural language questions
+            max_concurrency: Maximum number of questions in flight at once
+            rate_limit: Maximum number of questions started per second
+
+        Returns:
+            List of query() results, in the same order as the questions
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        throttle = asyncio.Lock()
+        interval = 1.0 / rate_limit if rate_limit else 0.0
+        next_start = 0.0
+
+        async def _run(question: str) -> Dict[str, Any]:
+            nonlocal next_start
+            async with semaphore:
+                if interval:
+                    async with throttle:
+                        loop = asyncio.get_running_loop()
+                        delay = next_start - loop.time()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        next_start = loop.time() + interval
+                return await self.aquery(question, use_memory=False)
+
+        return await asyncio.gather(*[_run(question) for question in questions])
+
+    def batch(
+        self,
+        questions: List[str],
+        max_concurrency: int = 10,
+        rate_limit: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Synchronous version of abatch()
+
+        The questions run on a thread pool instead of an event loop, so
+        batch() also works for callers inside a running loop (e.g. Jupyter).
+        """
+        throttle = threading.Lock()
+        interval = 1.0 / rate_limit if rate_limit else 0.0
+        next_start = 0.0
+
+        def _run(question: str) -> Dict[str, Any]:
+            nonlocal next_start
+            if interval:
+                with throttle:
+                    delay = next_start - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_start = time.monotonic() + interval
+            return self.query(question, use_memory=False)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            return list(pool.map(_run, questions))
+
+    def query_many(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Answer several questions with batched SQL and answer generation
+
+        Questions are looked up in the answer cache first. For the remaining
+        ones a single generate_text call (the SDK spreads the prompts over
+        the pooled connections) checks each cached SQL plan with
+        VERIFY_PROMPT and writes SQL, from the schema of the named tables,
+        for the questions without a plan. The accepted queries are executed
+        directly and all answers are written in a second batched call. Like
+        batch(), the questions are answered without conversation memory.
+        Questions that name no table, whose plan is rejected, or whose SQL
+        cannot be extracted or fails to run fall back to query() via
+        batch(), which uses threads and so also works inside a running
+        event loop; a failed generation call turns into error results for
+        the questions it covered.
+
+        Returns:
+            List of query() results, in the same order as the questions
+        """
+        turns = [self._start_turn(question, use_memory=False) for question in questions]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+
+        def _success(index: int, answer: str) -> None:
+            results[index] = {
+                "question": questions[index],
+                "answer": answer,
+                "status": "success",
+            }
+
+        def _errors(indices: List[int], error: Exception) -> None:
+            for index in indices:
+                results[index] = {
+                    "question": questions[index],
+                    "answer": f"Error: {str(error)}",
+                    "status": "error",
+                }
+
+        generating, planned, fallback = [], [], []
+        prompts = []
+        for index, turn in enumerate(turns):
+            if turn["cached"] is not None:
+                _success(index, turn["cached"])
+            elif turn["plan"] is None:
+                schema = self._prefetch_schema(questions[index])
+                if schema:
+                    generating.append(index)
+                    prompts.append(
+                        SQL_PROMPT.format(schema=schema, question=questions[index])
+                    )
+                else:
+                    fallback.append(index)
+        for index, turn in enumerate(turns):
+            if turn["cached"] is None and turn["plan"] is not None:
+                planned.append(index)
+                prompts.append(
+                    VERIFY_PROMPT.format(question=questions[index], sql=turn["plan"])
+                )
+
+        executed = []
+        requested = generating + planned
+        if requested:
+            try:
+                completions = next(self._sql_rr).watsonx_model.generate_text(
+                    prompt=prompts
+                )
+            except Exception as e:
+                _errors(requested, e)
+                completions = []
+
+            for index, completion in zip(requested, completions):
+                try:
+                    if turns[index]["plan"] is None:
+                        sql = _extract_sql(completion)
+                    elif "YES" in completion.upper():
+                        sql = turns[index]["plan"]
+                    else:
+                        raise ValueError("The cached plan does not fit the question")
+                    executed.append((index, sql, self._run_sql(sql)))
+                except ValueError:
+                    fallback.append(index)
+
+        if executed:
+            prompts = [
+                ANSWER_PROMPT.format(question=questions[index], sql=sql, rows=rows)
+                for index, sql, rows in executed
+            ]
+            try:
+                answers = next(self._rr).watsonx_model.generate_text(prompt=prompts)
+            except Exception as e:
+                _errors([index for index, _, _ in executed], e)
+                answers = []
+
+            for (index, sql, _), answer in zip(executed, answers):
+                answer = answer.strip()
+                self._finish_turn(turns[index], answer, sql)
+                _success(index, answer)
+
+        if fallback:
+            retried = self.batch([questions[index] for index in fallback])
+            for index, result in zip(fallback, retried):
+                results[index] = result
+        return results
+
+    def _stream_llm(self, prompts: Iterator[Any]) -> Iterator[str]:
+        """Stream the completion of each prompt from the next LLM endpoint"""
+        for prompt in prompts:
+            yield from next(self._rr).stream(prompt)
+
+    async def _astream_llm(self, prompts: AsyncIterator[Any]) -> AsyncIterator[str]:
+        """Asynchronous version of _stream_llm()"""
+        async for prompt in prompts:
+            async for chunk in next(self._rr).astream(prompt):
+                yield chunk
+
+    def stream(self, question: str, use_memory: bool = True) -> Iterator[str]:
+        """
+        Answer a question, yielding the answer text as it is generated
+
+        Tries the caches, the fast chain and the agent in turn, like query().
+        Cached answers are yielded at once; fast chain answers are streamed
+        token by token and agent answers as soon as the agent finishes.
+        """
+        turn = self._start_turn(question, use_memory)
+        if turn["cached"] is not None:
+            yield turn["cached"]
+            self._finish_turn(turn, turn["cached"])
+            return
+
+        answer, sql = yield from self._stream_plan(turn)
+        if answer is None:
+            answer, sql = yield from self._stream_fast_chain(turn)
+        if answer is None:
+            answer, sql = yield from self._stream_agent(turn)
+        self._finish_turn(turn, answer, sql)
+
+    def _answer(self, question: str, use_memory: bool = True) -> str:
+        """Answer a question from the caches, the fast chain or the agent"""
+        return "".join(self.stream(question, use_memory))
+
+    async def _aanswer(self, question: str, use_memory: bool = True) -> str:
+        """Asynchronous version of _answer()"""
+        turn = self._start_turn(question, use_memory)
+        if turn["cached"] is not None:
+            self._finish_turn(turn, turn["cached"])
+            return turn["cached"]
+
+        answer, sql = await self._ainvoke_plan(turn)
+        if answer is None:
+            answer, sql = await self._ainvoke_fast_chain(turn)
+        if answer is None:
+            answer, sql = await self._ainvoke_agent(turn)
+        self._finish_turn(turn, answer, sql)
+        return answer
+
+    def _start_turn(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
+        """
+        Put a question in context and look it up in the answer and plan caches
+
+        Returns the turn state shared by stream() and _aanswer(): the input
+        for the LLM, the cache keys, the cached answer (or None) and the
+        cached SQL plan (or None). Only follow-up questions (pronouns,
+        ellipsis, see _is_follow_up) are put in the conversation context;
+        they skip both caches, which are keyed on the bare question. Other
+        questions are answered and cached on their own.
+        """
+        follow_up = use_memory and _is_follow_up(question)
+        context = self._contextualize(question) if follow_up else question
+        template, literals = _question_template(question)
+        turn = {
+            "question": question,
+            "input": context,
+            "use_memory": use_memory,
+            "cacheable": context == question,
+            "cache_key": _normalize_question(question),
+            "template": template,
+            "literals": literals,
+            "cached": None,
+            "plan": None,
+        }
+        if turn["cacheable"]:
+            turn["cached"] = self._cached_answer(turn["cache_key"])
+        if turn["cacheable"] and turn["cached"] is None:
+            turn["plan"] = self._lookup_plan(template, literals)
+        return turn
+
+    def _finish_turn(
+        self, turn: Dict[str, Any], answer: str, sql: Optional[str] = None
+    ) -> None:
+        """Store a turn's answer and SQL plan and record it in memory"""
+        if turn["cacheable"] and sql:
+            self._remember_plan(turn["template"], turn["literals"], sql)
+        if turn["cacheable"] and turn["cached"] is None:
+            self._cache_answer(turn["cache_key"], answer)
+        if turn["use_memory"]:
+            self._remember_turn(turn["question"], answer, sql)
+
+    def _stream_plan(
+        self, turn: Dict[str, Any]
+    ) -> Generator[str, None, Tuple[Optional[str], Optional[str]]]:
+        """Stream the cached plan's answer; returns (answer, sql) or (None, None)"""
+        sql = turn["plan"]
+        rows = self._run_plan(turn["question"], sql) if sql else None
+        if rows is None:
+            return None, None
+
+        prompt = ANSWER_PROMPT.format(question=turn["question"], sql=sql, rows=rows)
+        parts = []
+        for chunk in self._stream_llm([prompt]):
+            parts.append(chunk)
+            yield chunk
+        return "".join(parts), sql
+
+    async def _ainvoke_plan(
+        self, turn: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Asynchronous, non-streaming version of _stream_plan()"""
+        sql = turn["plan"]
+        rows = await self._arun_plan(turn["question"], sql) if sql else None
+        if rows is None:
+            return None, None
+
+        prompt = ANSWER_PROMPT.format(question=turn["question"], sql=sql, rows=rows)
+        return await next(self._rr).ainvoke(prompt), sql
+
+    def _stream_fast_chain(
+        self, turn: Dict[str, Any]
+    ) -> Generator[str, None, Tuple[Optional[str], Optional[str]]]:
+        """Stream the fast chain answer; returns (answer, sql) or (None, None)"""
+        parts, sql = [], None
+        try:
+            for chunk in self.fast_chain.stream({"question": turn["input"]}):
+                sql = chunk.get("sql", sql)
+                if "answer" in chunk:
+                    parts.append(chunk["answer"])
+                    yield chunk["answer"]
+        except ValueError:
+            return None, None
+        return "".join(parts), sql
+
+    async def _ainvoke_fast_chain(
+        self, turn: Dict[str, Any]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Asynchronous, non-streaming version of _stream_fast_chain()"""
+        try:
+            result = await self.fast_chain.ainvoke({"question": turn["input"]})
+        except ValueError:
+            return None, None
+        return result["answer"], result["sql"]
+
+    def _stream_agent(
+        self, turn: Dict[str, Any]
+    ) -> Generator[str, None, Tuple[str, Optional[str]]]:
+        """Stream the agent answer; returns (answer, sql of the final query)"""
+        final: Dict[str, Any] = {}
+        for chunk in self.agent_executor.stream({"input": self._agent_input(turn)}):
+            if "output" in chunk:
+                final = chunk
+                yield chunk["output"]
+
+        if "output" not in final:
+            yield "No result"
+        return final.get("output", "No result"), self._final_sql(final)
+
+    async def _ainvoke_agent(self, turn: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Asynchronous, non-streaming version of _stream_agent()"""
+        result = await self.agent_executor.ainvoke(
+            {"input": await self._aagent_input(turn)}
+        )
+        return result.get("output", "No result"), self._final_sql(result)
+
+    def _contextualize(self, question: str) -> str:
+        """
+        Prefix a question with the conversation context
+
+        The context holds the resolved slots (active table and filters), the
+        last memory_k turns and, with Mem0 enabled, the most relevant stored
+        memories. Without any context the question is returned unchanged.
+        """
+        context = []
+        if self.slots["active_table"]:
+            context.append(f"Active table: {self.slots['active_table']}")
+        if self.slots["active_filters"]:
+            filters = ", ".join(
+                f"{column} = {value}"
+                for column, value in self.slots["active_filters"].items()
+            )
+            context.append(f"Active filters: {filters}")
+
+        for message in self.memory.load_memory_variables({})["history"]:
+            speaker = "User" if message.type == "human" else "Assistant"
+            context.append(f"{speaker}: {message.content[:MEMORY_MESSAGE_CHARS]}")
+
+        if self._mem0 is not None:
+            memories = self._mem0.search(
+                question, user_id=self.config.mem0_user_id, top_k=5
+            )
+            context.extend(f"Memory: {memory['memory']}" for memory in memories)
+
+        if not context:
+            return question
+        return "Context:\n" + "\n".join(context) + f"\n\nQuestion: {question}"
+
+    def _remember_turn(
+        self, question: str, answer: str, sql: Optional[str] = None
+    ) -> None:
+        """Record a finished turn in memory and update the slots from its SQL"""
+        self.memory.save_context({"input": question}, {"output": answer})
+
+        if sql:
+            table, filters = _parse_slots(sql)
+            if table:
+                self.slots["active_table"] = table
+            self.slots["active_filters"] = filters
+
+        if self._mem0 is not None:
+            self._mem0.add(
+                [
+                    {"role": "user", "content": question},
+                    {"role": "assistant", "content": answer},
+                ],
+                user_id=self.config.mem0_user_id,
+            )
+
+    def _cached_answer(self, cache_key: str) -> Optional[str]:
+        """
+        Look up a previous answer in the semantic cache
+
+        Questions that differ only in a literal or an entity ("top 5" vs
+        "top 10 artists", "customers from Canada" vs "from Brazil") embed
+        almost identically, so a similarity hit is only accepted when the
+        cached entry was stored for the same normalized question.
+        """
+        if self._sem_cache is None:
+            return None
+
+        entry = self._sem_cache.get(cache_key)
+        try:
+            entry = json.loads(entry)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("question") != cache_key:
+            return None
+        return entry.get("answer")
+
+    def _cache_answer(self, cache_key: str, answer: str) -> None:
+        """Store an answer in the semantic cache, along with its question"""
+        if self._sem_cache is not None:
+            self._sem_cache.put(
+                cache_key, json.dumps({"question": cache_key, "answer": answer})
+            )
+
+    def _lookup_plan(self, template: str, literals: List[str]) -> Optional[str]:
+        """Return the cached SQL for a question template, adapted to its literals"""
+        plan = self._plan_cache.get(template)
+        if plan is None:
+            return None
+
+        self._plan_cache.move_to_end(template)
+        sql, cached_literals = plan
+        return _substitute_literals(sql, cached_literals, literals)
+
+    def _final_sql(self, result: Dict[str, Any]) -> Optional[str]:
+        """Return the last SQL query of an agent run, if it succeeded"""
+        for action, observation in reversed(result.get("intermediate_steps", [])):
+            if action.tool != self._query_tool.name:
+                continue
+            if _is_error(observation):
+                return None
+
+            sql = action.tool_input
+            if isinstance(sql, dict):
+                sql = sql.get("query", "")
+            return sql.strip() or None
+        return None
+
+    def _remember_plan(self, template: str, literals: List[str], sql: str) -> None:
+        """Store the SQL for a question template, evicting the oldest entry"""
+        self._plan_cache[template] = (sql, literals)
+        self._plan_cache.move_to_end(template)
+        if len(self._plan_cache) > self.PLAN_CACHE_SIZE:
+            self._plan_cache.popitem(last=False)
+
+    def _run_plan(self, question: str, sql: str) -> Optional[str]:
+        """
+        Speculatively execute a cached SQL plan (or freshly generated SQL)
+
+        The query runs on a worker thread while the LLM checks that the SQL
+        still answers the question; the rows are only returned if the check
+        passes. Threads (rather than an event loop) keep this usable from
+        callers that are already inside a running loop.
+        """
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            rows = pool.submit(self._query_tool.run, sql)
+            verdict = next(self._sql_rr).invoke(
+                VERIFY_PROMPT.format(question=question, sql=sql)
+            )
+            rows = rows.result()
+
+        if _is_error(rows) or "YES" not in str(verdict).upper():
+            return None
+        return str(rows)
+
+    async def _arun_plan(self, question: str, sql: str) -> Optional[str]:
+        """Asynchronous version of _run_plan()"""
+        rows, verdict = await asyncio.gather(
+            asyncio.to_thread(self._query_tool.run, sql),
+            next(self._sql_rr).ainvoke(
+                VERIFY_PROMPT.format(question=question, sql=sql)
+            ),
+        )
+
+        if _is_error(rows) or "YES" not in str(verdict).upper():
+            return None
+        return str(rows)
+
     def run_interactive(self):
         """Run the agent in interactive mode using LCEL + Tools"""
         print("\n" + "=" * 70)
@@ -256,8 +1336,7 @@ Always be helpful and explain what you're doing."""
         print("  • query_sql_database: Execute SQL queries")
         print("  • info_sql_database: Get table schema")
         print("  • list_sql_database: List tables")
-        print("  • validate_sql_query: Validate queries")
-        print("  • recover_from_error: Error recovery")
+        print("  (queries are validated and errors explained automatically)")
         print("\nType 'exit' to quit")
         print("=" * 70 + "\n")
 
@@ -271,10 +1350,11 @@ Always be helpful and explain what you're doing."""
 
             try:
                 print("\n🔄 Processing your question...\n")
-                result = self.query(question)
-                print(f"\n✅ Status: {result.get('status', 'unknown')}")
-                print(f"📝 Question: {result.get('question', '')}")
-                print(f"💬 Answer:\n{result.get('answer', 'No result')}\n")
+                print("💬 Answer:")
+                for text in self.stream(question):
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                print("\n")
                 print("-" * 70 + "\n")
             except Exception as e:
                 print(f"\n❌ Error: {str(e)}\n")
@@ -298,7 +1378,7 @@ def main():
     print("  • QuerySQLDatabaseTool: Execute SQL queries")
     print("  • InfoSQLDatabaseTool: Get table schema information")
     print("  • ListSQLDatabaseTool: List available tables")
-    print("  • Custom Tools: Validation and error recovery")
+    print("  • Built-in validation and error recovery for SQL queries")
     print("=" * 80 + "\n")
 
     try:
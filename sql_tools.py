@@ -0,0 +1,45 @@
+"""
+SQL Tools Module
+
+LangChain tools used by the SQL Agent that extend the community SQL database
+tools with checks which run on every call instead of being separate tools the
+LLM has to decide to call.
+"""
+
+from typing import Callable, Optional
+
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain_core.callbacks import CallbackManagerForToolRun
+
+
+class SafeQuerySQLDatabaseTool(QuerySQLDatabaseTool):
+    """
+    QuerySQLDatabaseTool that validates queries and explains failures
+
+    Queries for which validate_query raises ValueError are not executed;
+    the reason is returned as a warning observation instead. Failed queries
+    have a recovery suggestion from recover_from_error appended to the error.
+    """
+
+    validate_query: Callable[[str], None]
+    recover_from_error: Callable[[str], str]
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        """Validate and execute the query, explaining any error"""
+        try:
+            self.validate_query(query)
+        except ValueError as e:
+            return f"⚠️ {str(e)}"
+
+        try:
+            result = super()._run(query, run_manager)
+        except Exception as e:
+            result = f"Error: {str(e)}"
+
+        if isinstance(result, str) and result.startswith("Error"):
+            return f"{result}\n{self.recover_from_error(result)}"
+        return result
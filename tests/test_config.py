@@ -3,6 +3,7 @@ Tests for configuration modules
 """
 
 import os
+import sys
 import pytest
 from dotenv import load_dotenv
 
@@ -20,9 +21,20 @@ class TestSQLAgentConfig:
         config = SQLAgentConfig()
         assert config.model_id == "ibm/granite-3-2-8b-instruct"
         assert config.max_tokens == 1024
+        assert config.agent_max_tokens == 256
+        assert config.sql_max_tokens == 128
         assert config.temperature == 0.2
         assert config.top_p == 0.95
         assert config.repetition_penalty == 1.2
+        assert config.max_connections == 200
+        assert config.max_keepalive == 100
+        assert config.prewarm is True
+        assert config.llm_cache is False
+        assert config.verbose is False
+        assert config.db_pool_size == 10
+        assert config.db_max_overflow == 20
+        assert config.ibm_urls == [config.ibm_url]
+        assert config.ibm_project_ids == [config.ibm_project_id]
 
     def test_config_from_env(self):
         """Test that config reads from environment variables"""
@@ -31,6 +43,7 @@ class TestSQLAgentConfig:
 
         from sql_agent import SQLAgentConfig
 
+        SQLAgentConfig.refresh()
         config = SQLAgentConfig()
         assert config.max_tokens == 512
         assert config.temperature == 0.7
@@ -38,6 +51,36 @@ class TestSQLAgentConfig:
         # Cleanup
         del os.environ["MAX_TOKENS"]
         del os.environ["TEMPERATURE"]
+        SQLAgentConfig.refresh()
+
+    def test_config_multiple_endpoints(self):
+        """Test that LLM endpoints are read as comma-separated lists"""
+        os.environ["IBM_URLS"] = "https://a.example.com, https://b.example.com"
+
+        from sql_agent import SQLAgentConfig
+
+        SQLAgentConfig.refresh()
+        config = SQLAgentConfig()
+        assert config.ibm_urls == ["https://a.example.com", "https://b.example.com"]
+
+        # Cleanup
+        del os.environ["IBM_URLS"]
+        SQLAgentConfig.refresh()
+
+    def test_config_env_is_cached(self):
+        """Test that environment changes need an explicit refresh"""
+        from sql_agent import SQLAgentConfig
+
+        SQLAgentConfig.refresh()
+        SQLAgentConfig()
+        os.environ["MAX_TOKENS"] = "512"
+        try:
+            assert SQLAgentConfig().max_tokens == 1024
+            SQLAgentConfig.refresh()
+            assert SQLAgentConfig().max_tokens == 512
+        finally:
+            del os.environ["MAX_TOKENS"]
+            SQLAgentConfig.refresh()
 
 
 class TestLLMConfig:
@@ -58,11 +101,52 @@ class TestLLMConfig:
 
         from llm_agent import LLMConfig
 
+        LLMConfig.refresh()
         config = LLMConfig()
         assert config.max_tokens == 1024
 
         # Cleanup
         del os.environ["MAX_TOKENS"]
+        LLMConfig.refresh()
+
+    def test_pool_limits_reach_api_client(self, monkeypatch):
+        """Test that LLM_MAX_CONN/LLM_MAX_KEEPALIVE size both httpx clients"""
+        import types
+
+        httpx = types.ModuleType("httpx")
+        httpx.Limits = lambda **kwargs: kwargs
+        httpx.Client = lambda **kwargs: ("sync", kwargs)
+        httpx.AsyncClient = lambda **kwargs: ("async", kwargs)
+        ibm_watsonx_ai = types.ModuleType("ibm_watsonx_ai")
+        ibm_watsonx_ai.APIClient = lambda **kwargs: kwargs
+        monkeypatch.setitem(sys.modules, "httpx", httpx)
+        monkeypatch.setitem(sys.modules, "ibm_watsonx_ai", ibm_watsonx_ai)
+        monkeypatch.setenv("LLM_MAX_CONN", "7")
+        monkeypatch.setenv("LLM_MAX_KEEPALIVE", "3")
+
+        from llm_agent import HTTP_TIMEOUT, LLMConfig, get_api_client
+
+        LLMConfig.refresh()
+        config = LLMConfig()
+        get_api_client.cache_clear()
+        try:
+            kwargs = get_api_client(
+                config.ibm_url,
+                config.ibm_project_id,
+                config.max_connections,
+                config.max_keepalive,
+            )
+        finally:
+            get_api_client.cache_clear()
+            monkeypatch.undo()
+            LLMConfig.refresh()
+
+        pool = {
+            "limits": {"max_connections": 7, "max_keepalive_connections": 3},
+            "timeout": HTTP_TIMEOUT,
+        }
+        assert kwargs["httpx_client"] == ("sync", pool)
+        assert kwargs["async_httpx_client"] == ("async", pool)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,347 @@
+"""
+Tests for SQL agent helpers
+"""
+
+import pytest
+
+
+class TestPlanCacheHelpers:
+    """Test question templating used by the plan cache"""
+
+    def test_question_template_replaces_literals(self):
+        """Test that numbers and quoted strings become placeholders"""
+        from sql_agent import _question_template
+
+        template, literals = _question_template("Top 5 artists from  'Canada'")
+        assert template == "top <n> artists from <s>"
+        assert literals == ["5", "Canada"]
+
+    def test_substitute_literals(self):
+        """Test that cached SQL is adapted to the new literals"""
+        from sql_agent import _substitute_literals
+
+        sql = "SELECT * FROM Customer WHERE Country = 'Canada' LIMIT 5"
+        adapted = _substitute_literals(sql, ["5", "Canada"], ["10", "USA"])
+        assert adapted == "SELECT * FROM Customer WHERE Country = 'USA' LIMIT 10"
+
+    def test_substitute_literals_missing_literal(self):
+        """Test that SQL not containing a changed literal is rejected"""
+        from sql_agent import _substitute_literals
+
+        sql = "SELECT * FROM Customer LIMIT 5"
+        assert _substitute_literals(sql, ["5", "Canada"], ["5", "USA"]) is None
+
+    def test_substitute_literals_skips_decimals(self):
+        """Test that literals inside decimal numbers are left alone"""
+        from sql_agent import _substitute_literals
+
+        sql = "SELECT * FROM Track WHERE UnitPrice > 0.5 LIMIT 5"
+        adapted = _substitute_literals(sql, ["5"], ["10"])
+        assert adapted == "SELECT * FROM Track WHERE UnitPrice > 0.5 LIMIT 10"
+
+
+class TestSQLExtraction:
+    """Test extraction of SQL from LLM output"""
+
+    def test_extract_sql_from_code_block(self):
+        """Test that fences, prose and the terminator are stripped"""
+        from sql_agent import _extract_sql
+
+        text = "Here you go:\n```sql\nSELECT COUNT(*) FROM Album;\n```"
+        assert _extract_sql(text) == "SELECT COUNT(*) FROM Album"
+
+    def test_extract_sql_ignores_keyword_in_preamble(self):
+        """Test that "with" in prose before a fenced block is not matched"""
+        from sql_agent import _extract_sql
+
+        text = (
+            "Sure, here is the query with MySQL syntax:\n"
+            "```sql\nSELECT COUNT(*) FROM Album;```"
+        )
+        assert _extract_sql(text) == "SELECT COUNT(*) FROM Album"
+
+    def test_extract_sql_ignores_lowercase_keyword_in_prose(self):
+        """Test that "select" in prose before an unfenced query is not matched"""
+        from sql_agent import _extract_sql
+
+        text = "To select the albums, run:\nSELECT Title FROM Album LIMIT 5;"
+        assert _extract_sql(text) == "SELECT Title FROM Album LIMIT 5"
+
+    def test_extract_sql_without_query(self):
+        """Test that output without a query is rejected"""
+        from sql_agent import _extract_sql
+
+        with pytest.raises(ValueError):
+            _extract_sql("I don't know.")
+
+
+class TestSlotParsing:
+    """Test extraction of the conversation slots from executed SQL"""
+
+    def test_parse_slots_table_and_filters(self):
+        """Test that the FROM table and equality filters are extracted"""
+        from sql_agent import _parse_slots
+
+        sql = (
+            "SELECT Name FROM `Customer` WHERE Country = 'Canada' "
+            "AND SupportRepId = 3 ORDER BY Name LIMIT 5"
+        )
+        assert _parse_slots(sql) == (
+            "Customer",
+            {"Country": "'Canada'", "SupportRepId": "3"},
+        )
+
+    def test_parse_slots_stops_at_group_by(self):
+        """Test that clauses after WHERE are not read as filters"""
+        from sql_agent import _parse_slots
+
+        sql = "SELECT GenreId, COUNT(*) FROM Track WHERE MediaTypeId = 1 GROUP BY 1"
+        assert _parse_slots(sql) == ("Track", {"MediaTypeId": "1"})
+
+    def test_parse_slots_without_where(self):
+        """Test that a query without WHERE has no filters"""
+        from sql_agent import _parse_slots
+
+        assert _parse_slots("SELECT COUNT(*) FROM Album") == ("Album", {})
+
+
+@pytest.fixture
+def agent():
+    """SQLAgent instance without LLM or database connections"""
+    from sql_agent import SQLAgent
+
+    return SQLAgent.__new__(SQLAgent)
+
+
+class TestQueryChecks:
+    """Test SQL validation and error recovery suggestions"""
+
+    def test_validate_flags_dangerous_keyword(self, agent):
+        """Test that dangerous statements are rejected"""
+        with pytest.raises(ValueError, match="dangerous keyword: DROP"):
+            agent._validate_sql_query("drop table Album")
+
+    def test_validate_ignores_keyword_inside_identifier(self, agent):
+        """Test that identifiers containing a keyword are allowed"""
+        assert agent._validate_sql_query("SELECT deleted_at FROM Track") is None
+
+    def test_recover_from_error(self, agent):
+        """Test that known errors get a suggestion"""
+        result = agent._recover_from_error("Error: Access denied for user")
+        assert result.startswith("💡 Suggestion: Verify database credentials")
+
+
+class TestSemanticCache:
+    """Test the question guard on semantic cache hits"""
+
+    @pytest.fixture
+    def similar_cache(self, agent):
+        """Fake GPTCache whose similarity lookup returns the latest entry"""
+        store = []
+        agent._sem_cache = type(
+            "FakeCache",
+            (),
+            {
+                "get": lambda _, key: store[-1] if store else None,
+                "put": lambda _, key, value: store.append(value),
+            },
+        )()
+        return agent
+
+    def test_cached_answer_for_same_question(self, similar_cache):
+        """Test that the stored question is answered from the cache"""
+        similar_cache._cache_answer("customers from canada", "8 customers")
+        assert similar_cache._cached_answer("customers from canada") == "8 customers"
+
+    def test_cached_answer_rejects_other_entity(self, similar_cache):
+        """Test that a similar question about another entity is a miss"""
+        similar_cache._cache_answer("customers from canada", "8 customers")
+        assert similar_cache._cached_answer("customers from brazil") is None
+
+    def test_cached_answer_rejects_other_literal(self, similar_cache):
+        """Test that a similar question with another number is a miss"""
+        similar_cache._cache_answer("top 5 artists", "AC/DC, Accept, ...")
+        assert similar_cache._cached_answer("top 10 artists") is None
+
+    def test_cached_answer_without_cache(self, agent):
+        """Test that lookups miss when GPTCache is unavailable"""
+        agent._sem_cache = None
+        assert agent._cached_answer("top 5 artists") is None
+
+
+class TestBatch:
+    """Test the synchronous batch API"""
+
+    def test_batch_inside_running_loop(self, agent):
+        """Test that batch() works when called from a running event loop"""
+        import asyncio
+
+        agent.query = lambda question, use_memory=True: {
+            "question": question,
+            "answer": question.upper(),
+            "use_memory": use_memory,
+        }
+
+        async def _caller():
+            return agent.batch(["a", "b", "c"])
+
+        results = asyncio.run(_caller())
+        assert [result["answer"] for result in results] == ["A", "B", "C"]
+        assert not any(result["use_memory"] for result in results)
+
+    def test_batch_rate_limit(self, agent):
+        """Test that rate_limit spaces out the question start times"""
+        import time
+
+        starts = []
+
+        def _query(question, use_memory=True):
+            starts.append(time.monotonic())
+            return {"question": question}
+
+        agent.query = _query
+        agent.batch(["a", "b", "c"], max_concurrency=3, rate_limit=20)
+        starts.sort()
+        assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+    def test_abatch_max_concurrency(self, agent):
+        """Test that no more than max_concurrency questions run at once"""
+        import asyncio
+
+        running, peak = 0, 0
+
+        async def _aquery(question, use_memory=True):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"question": question, "use_memory": use_memory}
+
+        agent.aquery = _aquery
+        results = asyncio.run(agent.abatch(list("abcdef"), max_concurrency=2))
+        assert peak == 2
+        assert [result["question"] for result in results] == list("abcdef")
+        assert not any(result["use_memory"] for result in results)
+
+    def test_abatch_rate_limit(self, agent):
+        """Test that rate_limit spaces out the question start times"""
+        import asyncio
+
+        starts = []
+
+        async def _aquery(question, use_memory=True):
+            starts.append(asyncio.get_running_loop().time())
+            return {"question": question}
+
+        agent.aquery = _aquery
+        asyncio.run(agent.abatch(["a", "b", "c"], max_concurrency=3, rate_limit=20))
+        assert all(b - a >= 0.045 for a, b in zip(starts, starts[1:]))
+
+
+class TestQueryMany:
+    """Test batched question answering"""
+
+    @pytest.fixture
+    def batched(self, agent):
+        """Agent whose batched SQL and answer calls are recorded"""
+        import itertools
+        from collections import OrderedDict
+        from types import SimpleNamespace
+
+        prompts = []
+
+        def _generate(prompt):
+            prompts.extend(prompt)
+            return [
+                "YES" if text.endswith("YES or NO.") else "SELECT 1"
+                for text in prompt
+            ]
+
+        llm = SimpleNamespace(watsonx_model=SimpleNamespace(generate_text=_generate))
+        agent._sem_cache = None
+        agent._plan_cache = OrderedDict()
+        agent._sql_rr = itertools.cycle([llm])
+        agent._prefetch_schema = lambda question: "CREATE TABLE Album"
+        agent._run_sql = lambda sql: "[(3,)]"
+        agent._rr = itertools.cycle(
+            [
+                SimpleNamespace(
+                    watsonx_model=SimpleNamespace(
+                        generate_text=lambda prompt: ["3"] * len(prompt)
+                    )
+                )
+            ]
+        )
+        agent.prompts = prompts
+        return agent
+
+    def test_generation_failure_yields_error_results(self, batched):
+        """Test that a failed generate_text call does not raise"""
+        import itertools
+        from types import SimpleNamespace
+
+        def _fail(prompt):
+            raise RuntimeError("rate limited")
+
+        llm = SimpleNamespace(watsonx_model=SimpleNamespace(generate_text=_fail))
+        batched._sql_rr = itertools.cycle([llm])
+
+        results = batched.query_many(["How many albums?", "How many artists?"])
+        assert [result["status"] for result in results] == ["error", "error"]
+        assert results[0]["answer"] == "Error: rate limited"
+        assert results[1]["question"] == "How many artists?"
+
+    def test_cached_plan_is_verified_not_regenerated(self, batched):
+        """Test that a question with a cached plan only gets a check prompt"""
+        batched._remember_plan(
+            "how many albums by artist <n>?",
+            ["1"],
+            "SELECT COUNT(*) FROM Album WHERE ArtistId = 1",
+        )
+
+        results = batched.query_many(["How many albums by artist 2?"])
+        assert results[0]["answer"] == "3"
+        assert len(batched.prompts) == 1
+        assert "WHERE ArtistId = 2" in batched.prompts[0]
+        assert batched.prompts[0].endswith("Answer YES or NO.")
+
+    def test_fallback_inside_running_loop(self, batched):
+        """Test that questions naming no table fall back to query()"""
+        import asyncio
+
+        batched._prefetch_schema = lambda question: ""
+        batched.query = lambda question, use_memory=True: {
+            "question": question,
+            "answer": "agent",
+            "status": "success",
+        }
+
+        async def _caller():
+            return batched.query_many(["Hello", "Hi"])
+
+        results = asyncio.run(_caller())
+        assert [result["answer"] for result in results] == ["agent", "agent"]
+        assert batched.prompts == []
+
+
+class TestSchemaPrefetch:
+    """Test selection of the tables whose schema is prefetched"""
+
+    def test_top_tables_matches_question_words(self, agent):
+        """Test that tables named in the question are selected"""
+        agent._cached_table_names = lambda: "Album, Artist, Track"
+        assert agent._top_tables("How many albums per artist?") == "Album, Artist"
+        assert agent._top_tables("Hello") == ""
+
+    def test_agent_input_without_schema(self):
+        """Test that only the table list is prefetched when nothing matches"""
+        from sql_agent import _format_agent_input
+
+        prefetched = {"tables": "Album, Artist", "schema": ""}
+        text = _format_agent_input(prefetched, "Hello")
+        assert text == "Tables: Album, Artist\n\nHello"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,260 @@
+"""
+Tests for the SQL agent pipeline with a scripted LLM and a SQLite database
+"""
+
+from typing import Any, Iterator, List, Optional
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+from langchain_core.language_models.llms import LLM  # noqa: E402
+from langchain_core.outputs import GenerationChunk  # noqa: E402
+from pydantic import Field  # noqa: E402
+
+
+class ScriptedLLM(LLM):
+    """Fake LLM that answers each kind of pipeline prompt with a fixed reply"""
+
+    sql: str = "SELECT COUNT(*) FROM Album"
+    verdict: str = "YES"
+    answer: str = "There are 3 albums."
+    calls: List[str] = Field(default_factory=list)
+    prompts: List[str] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _reply(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if prompt.startswith("MySQL schema:"):
+            self.calls.append("sql")
+            return self.sql
+        if "Answer YES or NO" in prompt:
+            self.calls.append("verify")
+            return self.verdict
+        if prompt.startswith("Question:"):
+            self.calls.append("answer")
+            return self.answer
+        self.calls.append("agent")
+        if prompt.rstrip().endswith("Thought:"):
+            return f"I now know the final answer\nFinal Answer: {self.answer}"
+        return (
+            "Thought: I should count the albums\n"
+            "Action: sql_db_query\n"
+            "Action Input: SELECT COUNT(*) FROM Album"
+        )
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        return self._reply(prompt)
+
+    def _stream(
+        self, prompt: str, stop: Optional[List[str]] = None, **kwargs
+    ) -> Iterator[GenerationChunk]:
+        for word in self._reply(prompt).split(" "):
+            yield GenerationChunk(text=word + " ")
+
+
+class ExactCache:
+    """Fake GPTCache with exact-match lookups"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key: str) -> Any:
+        return self.store.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        self.store[key] = value
+
+
+@pytest.fixture
+def llm():
+    """Scripted LLM shared by every pipeline step"""
+    return ScriptedLLM()
+
+
+@pytest.fixture
+def pipeline(llm, monkeypatch):
+    """SQLAgent wired to the scripted LLM and an in-memory SQLite database"""
+    from langchain_community.utilities.sql_database import SQLDatabase
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+
+    from sql_agent import SQLAgent, SQLAgentConfig
+
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    with engine.begin() as connection:
+        for statement in (
+            "CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT)",
+            "CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title TEXT, "
+            "ArtistId INTEGER)",
+            "INSERT INTO Artist VALUES (1, 'AC/DC'), (2, 'Accept')",
+            "INSERT INTO Album VALUES (1, 'Let There Be Rock', 1), "
+            "(2, 'Restless', 2), (3, 'Balls to the Wall', 2)",
+        ):
+            connection.execute(text(statement))
+    db = SQLDatabase(engine)
+
+    monkeypatch.setattr(SQLAgent, "_initialize_llms", lambda self, *args: [llm])
+    monkeypatch.setattr(SQLAgent, "_initialize_database", lambda self: db)
+    monkeypatch.setattr(
+        SQLAgent, "_initialize_semantic_cache", lambda self: ExactCache()
+    )
+
+    config = SQLAgentConfig()
+    config.prewarm = False
+    config.use_mem0 = False
+    return SQLAgent(config)
+
+
+class TestAnswerCache:
+    """Test that repeated questions are answered from the caches"""
+
+    def test_repeated_question_is_cache_hit(self, pipeline, llm):
+        """Test that the second of two query() calls makes no LLM call"""
+        first = pipeline.query("How many albums?")
+        calls = list(llm.calls)
+        second = pipeline.query("How many albums?")
+
+        assert first["status"] == second["status"] == "success"
+        assert second["answer"] == first["answer"]
+        assert calls == ["sql", "verify", "answer"]
+        assert llm.calls == calls
+
+    def test_follow_up_bypasses_cache(self, pipeline, llm):
+        """Test that a follow-up question is answered in context"""
+        pipeline.query("How many albums?")
+        llm.calls.clear()
+        pipeline.query("And their artists?")
+        pipeline.query("And their artists?")
+
+        assert llm.calls == ["sql", "verify", "answer"] * 2
+        assert "Active table: Album" in llm.prompts[-3]
+        assert "User: How many albums?" in llm.prompts[-3]
+
+
+class TestFastChain:
+    """Test the single-shot SQL chain"""
+
+    def test_prompt_holds_only_named_tables(self, pipeline, llm):
+        """Test that the SQL prompt carries the schema of the named tables"""
+        result = pipeline.fast_chain.invoke({"question": "How many albums?"})
+
+        assert result["rows"] == "[(3,)]"
+        assert "CREATE TABLE \"Album\"" in llm.prompts[0]
+        assert "CREATE TABLE \"Artist\"" not in llm.prompts[0]
+
+    def test_question_without_table_fails_before_llm(self, pipeline, llm):
+        """Test that the chain gives up without an LLM call"""
+        with pytest.raises(ValueError, match="names no table"):
+            pipeline.fast_chain.invoke({"question": "How many records?"})
+        assert llm.calls == []
+
+    def test_rejected_sql_fails(self, pipeline, llm):
+        """Test that SQL failing the verification is not answered"""
+        llm.verdict = "NO"
+        with pytest.raises(ValueError, match="does not fit"):
+            pipeline.fast_chain.invoke({"question": "How many albums?"})
+        assert llm.calls == ["sql", "verify"]
+
+
+class TestStream:
+    """Test streaming answers"""
+
+    def test_stream_yields_answer_in_chunks(self, pipeline, llm):
+        """Test that the fast chain answer arrives token by token"""
+        chunks = list(pipeline.stream("How many albums?"))
+
+        assert len(chunks) > 1
+        assert "".join(chunks).strip() == llm.answer
+        assert pipeline.query("How many albums?")["answer"] == "".join(chunks)
+
+
+class TestFallbackOrder:
+    """Test the cache → plan → fast chain → agent order"""
+
+    def test_plan_is_reused_after_answer_cache_miss(self, pipeline, llm):
+        """Test that a cached plan is verified instead of writing new SQL"""
+        pipeline.query("How many albums?")
+        pipeline._sem_cache.store.clear()
+        llm.calls.clear()
+
+        assert pipeline.query("How many albums?")["status"] == "success"
+        assert llm.calls == ["verify", "answer"]
+
+    def test_rejected_plan_falls_back_to_fast_chain(self, pipeline, llm):
+        """Test that a plan failing the check is replaced by new SQL"""
+        pipeline.query("How many albums?")
+        pipeline._sem_cache.store.clear()
+        llm.calls.clear()
+        llm.verdict = "NO"
+
+        pipeline.query("How many albums?")
+        assert llm.calls[:3] == ["verify", "sql", "verify"]
+        assert set(llm.calls[3:]) == {"agent"}
+
+    def test_question_without_table_goes_to_agent(self, pipeline, llm):
+        """Test that the agent answers when the fast chain cannot"""
+        result = pipeline.query("How many records are stored?")
+
+        assert result["answer"] == llm.answer
+        assert llm.calls == ["agent", "agent"]
+        assert list(pipeline._plan_cache.values()) == [
+            ("SELECT COUNT(*) FROM Album", [])
+        ]
+
+
+class TestConversationContext:
+    """Test the conversation slots and context"""
+
+    def test_turn_sets_slots_and_history(self, pipeline, llm):
+        """Test that a finished turn shows up in the next question's context"""
+        pipeline.query("How many albums?")
+
+        assert pipeline.slots == {"active_table": "Album", "active_filters": {}}
+        context = pipeline._contextualize("And their artists?")
+        assert context.startswith("Context:\nActive table: Album\n")
+        assert "User: How many albums?" in context
+        assert f"Assistant: {llm.answer}" in context
+        assert context.endswith("\n\nQuestion: And their artists?")
+
+    def test_turn_without_memory_is_not_remembered(self, pipeline):
+        """Test that use_memory=False leaves the context empty"""
+        pipeline.query("How many albums?", use_memory=False)
+
+        assert pipeline.slots["active_table"] is None
+        assert pipeline._contextualize("Brazil?") == "Brazil?"
+
+
+class TestSchemaCache:
+    """Test the schema TTL"""
+
+    def test_table_list_is_reread_after_ttl(self, pipeline, monkeypatch):
+        """Test that the table list is memoized until the TTL expires"""
+        from types import SimpleNamespace
+
+        import sql_agent
+
+        clock = [0.0]
+        monkeypatch.setattr(
+            sql_agent, "time", SimpleNamespace(monotonic=lambda: clock[0])
+        )
+        pipeline.config.schema_ttl_s = 60
+
+        assert pipeline._cached_table_names() == "Album, Artist"
+        clock[0] = 59.0
+        pipeline._cached_table_names()
+        assert pipeline._list_tables.cache_info().misses == 1
+        clock[0] = 61.0
+        pipeline._cached_table_names()
+        assert pipeline._list_tables.cache_info().misses == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,56 @@
+"""
+Tests for the SQL agent tools
+"""
+
+import pytest
+
+pytest.importorskip("langchain_community")
+
+
+@pytest.fixture
+def query_tool():
+    """SafeQuerySQLDatabaseTool over an in-memory SQLite database"""
+    from langchain_community.utilities.sql_database import SQLDatabase
+    from sqlalchemy.pool import StaticPool
+
+    from sql_agent import SQLAgent
+    from sql_tools import SafeQuerySQLDatabaseTool
+
+    db = SQLDatabase.from_uri(
+        "sqlite://",
+        engine_args={
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        },
+    )
+    db.run("CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, Title TEXT)")
+    db.run("INSERT INTO Album VALUES (1, 'For Those About To Rock')")
+
+    agent = SQLAgent.__new__(SQLAgent)
+    return SafeQuerySQLDatabaseTool(
+        db=db,
+        validate_query=agent._validate_sql_query,
+        recover_from_error=agent._recover_from_error,
+    )
+
+
+class TestSafeQuerySQLDatabaseTool:
+    """Test validation and error recovery inside the query tool"""
+
+    def test_dangerous_query_is_blocked(self, query_tool):
+        """Test that a DROP is rejected and never reaches the database"""
+        result = query_tool.run("DROP TABLE Album")
+        assert result == "⚠️ Query contains dangerous keyword: DROP"
+        assert "For Those About To Rock" in query_tool.run("SELECT Title FROM Album")
+
+    def test_database_error_gets_recovery_hint(self, query_tool):
+        """Test that a failing query is returned with a suggestion"""
+        result = query_tool.run("SELEC Title FROM Album")
+        assert result.startswith("Error")
+        assert result.splitlines()[-1] == (
+            "💡 Suggestion: Check SQL syntax - ensure proper spacing and quotes"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])